@@ -11,58 +11,181 @@ Detection runs at site-init time, where ``__main__.__file__`` is not set yet but
 site initialization.
 """
 
+from __future__ import annotations
+
 import os
-import subprocess
 import sys
 
 # Project markers that mean "this directory tree is a uv project".
 _PROJECT_MARKERS = ("pyproject.toml", "uv.lock")
 _MAX_PARENT_DEPTH = 10
 
+# Resolved start directory -> project root (or ``None``); see _find_project_root.
+_PROJECT_ROOT_CACHE: dict[str, str | None] = {}
+
+# Sentinel for "PATH not probed yet"; ``None`` means "probed, uv not found".
+_UNSET = object()
+_UV_PATH = _UNSET
+
+# Candidate ``uv`` file names, fixed at import: ``uv`` on POSIX, ``uv`` plus each
+# PATHEXT extension on Windows (site-init sees the same environment the lookup does).
+if sys.platform == "win32":
+    _UV_NAMES: tuple[str, ...] = tuple(
+        "uv" + ext.lower()
+        for ext in os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").split(os.pathsep)
+        if ext
+    )
+else:
+    _UV_NAMES = ("uv",)
+
+# Set by the first auto_use_uv() call so repeat calls skip all probing.
+_RAN = False
+
+# ``sys.argv[0]`` at site-init time for the REPL, ``python -c`` and ``python -m``.
+_NON_SCRIPT_ARGV0 = frozenset(("", "-c", "-m"))
+
+# AUTO_UV_DISABLE values that opt out of interception (matched case-insensitively).
+_TRUTHY = frozenset(("1", "true", "yes", "on"))
+
 # Directories whose scripts must never be hijacked (system / distro Python).
 _SYSTEM_DIRS = (
     "/usr/bin", "/usr/local/bin", "/opt/bin", "/bin", "/sbin",
     "/usr/sbin", "/usr/local/sbin",
 )
 
+# Venv / installation executable directories, as path segments and suffixes.
+_BIN_SEG = f"{os.sep}bin{os.sep}"
+_SCRIPTS_SEG = f"{os.sep}Scripts{os.sep}"
+_BIN_SUFFIX = f"{os.sep}bin"
+_SCRIPTS_SUFFIX = f"{os.sep}Scripts"
+
+# Script-path classification, precomputed once so each check is a single
+# C-level ``in`` / ``str.startswith(tuple)`` / ``str.endswith(tuple)`` call.
+_SKIP_SUBSTRINGS = ("site-packages", "dist-packages", _BIN_SEG, _SCRIPTS_SEG)
+_SKIP_SUFFIXES = (_BIN_SUFFIX, _SCRIPTS_SUFFIX)
+_SKIP_PREFIXES = tuple(
+    prefix + os.sep
+    for prefix in (
+        getattr(sys, "prefix", ""),
+        getattr(sys, "base_prefix", ""),
+        *_SYSTEM_DIRS,
+    )
+    if prefix  # an empty prefix would turn into a bare separator
+)
+
 
 def _env_disables(environ):
     """True if the environment opts out of interception."""
     if environ.get("UV_RUN_ACTIVE"):
         return True  # already inside `uv run` -> never recurse
-    return environ.get("AUTO_UV_DISABLE", "").lower() in ("1", "true", "yes")
+    value = environ.get("AUTO_UV_DISABLE")
+    if not value:
+        return False
+    return value in _TRUTHY or value.lower() in _TRUTHY
+
+
+def _locate_uv():
+    """Return the path of the ``uv`` executable on PATH, or ``None``.
+
+    The PATH walk runs at most once per process; the answer is cached in
+    ``_UV_PATH`` and reused by both the availability check and the exec.
+    Only absolute PATH entries are searched: empty, ``.``, ``./`` or
+    ``bin/..`` style entries all resolve against the working directory, so
+    a ``uv`` sitting there is never picked up and the cached path is always
+    absolute (``shutil.which`` checks the cwd first on Windows before
+    Python 3.12).
+    """
+    global _UV_PATH
+    if _UV_PATH is not _UNSET:
+        return _UV_PATH
+    found = None
+    for path_dir in os.environ.get("PATH", "").split(os.pathsep):
+        if not os.path.isabs(path_dir):
+            continue  # relative (incl. empty) entries mean the cwd
+        for name in _UV_NAMES:
+            candidate = os.path.join(path_dir, name)
+            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                found = candidate
+                break
+        if found is not None:
+            break
+    _UV_PATH = found
+    return found
+
+
+def _invalidate_uv_cache():
+    """Forget the cached ``uv`` location so the next call re-walks PATH.
+
+    PATH is not revalidated on every call; tests (and callers that edit PATH
+    in-process) reset the cache explicitly.
+    """
+    global _UV_PATH
+    _UV_PATH = _UNSET
 
 
 def _uv_available():
-    """True if a working ``uv`` is on PATH."""
-    try:
-        subprocess.run(
-            ["uv", "--version"], capture_output=True, check=True, timeout=2
-        )
-        return True
-    except (
-        subprocess.CalledProcessError,
-        subprocess.TimeoutExpired,
-        FileNotFoundError,
-        OSError,
-    ):
-        return False
+    """True if a ``uv`` executable is on PATH (no process is spawned)."""
+    return _locate_uv() is not None
 
 
-def _in_uv_project(cwd):
-    """True if ``cwd`` or any parent (up to a bounded depth) is a uv project."""
-    check_dir = cwd
-    for _ in range(_MAX_PARENT_DEPTH):
-        for marker in _PROJECT_MARKERS:
-            if os.path.exists(os.path.join(check_dir, marker)):
-                return True
-        if os.path.isdir(os.path.join(check_dir, ".venv")):
+def _has_project_marker(directory):
+    """True if ``directory`` contains a project marker or a ``.venv`` dir.
+
+    A fixed handful of ``stat`` calls, rather than listing the directory:
+    ancestors such as ``$HOME`` or ``/tmp`` can hold thousands of entries, and
+    a searchable-but-unreadable directory still answers ``stat``.
+    """
+    for marker in _PROJECT_MARKERS:
+        if os.path.exists(os.path.join(directory, marker)):
             return True
+    return os.path.isdir(os.path.join(directory, ".venv"))
+
+
+def _find_project_root(start_dir):
+    """Return the nearest uv project root at or above ``start_dir``, else ``None``.
+
+    Results are memoized in ``_PROJECT_ROOT_CACHE`` for every directory visited
+    on the way up, so sibling scripts and repeat calls cost one dict lookup.
+    """
+    key = os.path.abspath(start_dir)
+    try:
+        return _PROJECT_ROOT_CACHE[key]
+    except KeyError:
+        pass
+
+    visited = []
+    root = None
+    reached_top = False
+    check_dir = key
+    for _ in range(_MAX_PARENT_DEPTH):
+        visited.append(check_dir)
+        if _has_project_marker(check_dir):
+            root = check_dir
+            break
         parent = os.path.dirname(check_dir)
         if parent == check_dir:  # reached filesystem root
+            reached_top = True
             break
         check_dir = parent
-    return False
+
+    if root is not None or reached_top:
+        # Every visited dir resolves to the same answer from its own walk.
+        for visited_dir in visited:
+            _PROJECT_ROOT_CACHE[visited_dir] = root
+    else:
+        # Depth-capped miss: ancestors have more headroom, so only cache ``key``.
+        _PROJECT_ROOT_CACHE[key] = None
+    return root
+
+
+def _clear_project_root_cache():
+    """Forget memoized project roots (for tests and long-lived processes)."""
+    _PROJECT_ROOT_CACHE.clear()
+
+
+def _in_uv_project(cwd):
+    """True if ``cwd`` or any parent (up to a bounded depth) is a uv project."""
+    return _find_project_root(cwd) is not None
 
 
 def should_use_uv():
@@ -74,22 +197,28 @@ def should_use_uv():
     return _in_uv_project(os.getcwd())
 
 
-def _script_target(argv):
+def _script_target(argv, cwd=None):
     """Return the abs path of the user script iff ``argv`` is ``python <file.py>``.
 
     Returns ``None`` for the REPL (``argv[0] == ''``), ``python -c`` (``'-c'``),
     ``python -m mod`` (``'-m'`` at site-init time), stdin, or any ``argv[0]`` that
-    is not an existing regular file.
+    is not an existing regular file. A relative ``argv[0]`` is resolved against
+    ``cwd`` when given, sparing the extra ``getcwd()`` inside ``abspath``.
     """
     if not argv:
         return None
     arg0 = argv[0]
-    if not arg0 or arg0 in ("-c", "-m"):
+    if arg0 in _NON_SCRIPT_ARGV0:
         return None
     try:
-        if not os.path.isfile(arg0):
+        if cwd is None:
+            target = os.path.abspath(arg0)
+        else:
+            target = os.path.normpath(os.path.join(cwd, arg0))
+        # Check the resolved path, so an injected ``cwd`` is honoured too.
+        if not os.path.isfile(target):
             return None
-        return os.path.abspath(arg0)
+        return target
     except (OSError, ValueError):
         return None
 
@@ -101,37 +230,29 @@ def _is_excluded_script(script_path):
     living inside ``site-packages``, a venv ``bin``/``Scripts`` dir, the Python
     installation, or a system bin directory.
     """
-    sep = os.path.sep
-    if "site-packages" in script_path or "dist-packages" in script_path:
-        return True
-    if (
-        sep + "bin" + sep in script_path
-        or sep + "Scripts" + sep in script_path
-        or script_path.endswith(sep + "bin")
-        or script_path.endswith(sep + "Scripts")
-    ):
-        return True
-    for prefix in (getattr(sys, "prefix", ""), getattr(sys, "base_prefix", "")):
-        if prefix and script_path.startswith(prefix + sep):
-            return True
-    for sys_dir in _SYSTEM_DIRS:
-        if script_path == sys_dir or script_path.startswith(sys_dir + sep):
-            return True
-    return False
+    return (
+        any(segment in script_path for segment in _SKIP_SUBSTRINGS)
+        or script_path.endswith(_SKIP_SUFFIXES)
+        or script_path.startswith(_SKIP_PREFIXES)
+    )
 
 
 def _should_intercept(argv=None, cwd=None, environ=None):
     """Pure decision: should this interpreter startup be redirected to ``uv run``?
 
     Arguments default to the live process state but are injectable for testing.
+    Checks run cheapest-first: the env-var opt-outs and the REPL / ``-c`` /
+    ``-m`` shapes are rejected without a syscall. The working directory is
+    resolved once and shared by the script path resolution and the project walk.
     """
-    argv = sys.argv if argv is None else argv
-    cwd = os.getcwd() if cwd is None else cwd
     environ = os.environ if environ is None else environ
-
     if _env_disables(environ):
         return False
-    script = _script_target(argv)
+    argv = sys.argv if argv is None else argv
+    if not argv or argv[0] in _NON_SCRIPT_ARGV0:
+        return False  # REPL / -c / -m: no syscalls at all
+    cwd = os.getcwd() if cwd is None else cwd
+    script = _script_target(argv, cwd)
     if script is None:
         return False
     if _is_excluded_script(script):
@@ -141,33 +262,28 @@ def _should_intercept(argv=None, cwd=None, environ=None):
     return _in_uv_project(cwd)
 
 
-def _find_uv():
-    """Locate the ``uv`` executable on PATH (handles Windows suffixes)."""
-    names = ("uv", "uv.exe", "uv.cmd", "uv.bat")
-    for path_dir in os.environ.get("PATH", "").split(os.pathsep):
-        for name in names:
-            candidate = os.path.join(path_dir, name)
-            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
-                return candidate
-    return None
-
-
 def auto_use_uv():
     """Re-exec ``python <script.py>`` as ``uv run <script.py>`` inside a uv project.
 
     Invoked from the ``.pth`` autorun hook during site-initialization, so the
     entire body is guarded: it must never raise into interpreter startup.
+    Only the first call in a process does any work; later calls (e.g. an
+    explicit import-and-call after the hook already ran) return immediately.
     """
+    global _RAN
+    if _RAN:
+        return
+    _RAN = True
     try:
         if not _should_intercept():
             return
-        uv_path = _find_uv()
+        uv_path = _locate_uv()
         if uv_path is None:
             return
-        # Guard against infinite re-execution; the child sees UV_RUN_ACTIVE=1.
-        os.environ["UV_RUN_ACTIVE"] = "1"
         cmd = [uv_path, "run", *sys.argv]
-        os.execve(uv_path, cmd, os.environ)
+        # Guard against infinite re-execution; the child sees UV_RUN_ACTIVE=1.
+        # Only the child env carries it, so a failed exec leaves ours untouched.
+        os.execve(uv_path, cmd, {**os.environ, "UV_RUN_ACTIVE": "1"})
     except Exception as exc:  # never crash interpreter startup
         try:
             sys.stderr.write(f"auto-uv: skipped interception ({exc})\n")
@@ -0,0 +1,44 @@
+"""Shared fixtures for the auto-uv test suite."""
+
+import os
+import tempfile
+
+import pytest
+
+import auto_uv
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Start and end every test with empty uv-location and project-root caches."""
+    auto_uv._invalidate_uv_cache()
+    auto_uv._clear_project_root_cache()
+    yield
+    auto_uv._invalidate_uv_cache()
+    auto_uv._clear_project_root_cache()
+
+
+@pytest.fixture(scope="session")
+def probe_dir():
+    """One temp dir holding every probe script, removed in one go at session end."""
+    with tempfile.TemporaryDirectory(prefix="auto_uv_probes_") as path:
+        yield path
+
+
+@pytest.fixture(scope="session")
+def probe_script(probe_dir):
+    """Factory: ``probe_script(body)`` returns a script path, writing each body once."""
+    paths = {}
+
+    def write(body):
+        path = paths.get(body)
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".py", dir=probe_dir)
+            try:
+                os.write(fd, body)
+            finally:
+                os.close(fd)
+            paths[body] = path
+        return path
+
+    return write